@@ -1,23 +1,35 @@
 from google import genai
 from langgraph.graph import StateGraph, START, END
-from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
-from typing import TypedDict
+from typing import TypedDict, Optional
 import os
-import requests
-import io
+import json
+import httpx
 import re
+import tempfile
 
 load_dotenv()
 MURFAI_API_KEY=os.getenv("MURFAI_API_KEY")
 
 client_gemini = genai.Client(api_key=os.getenv("GENAI_API_KEY"))
 
-def ask_gemini(prompt: str) -> str:
+# Shared across requests so Murf calls reuse pooled HTTP/2 connections
+# instead of paying a fresh TCP+TLS handshake each time.
+ASYNC_HTTP = httpx.AsyncClient(
+    http2=True,
+    follow_redirects=True,
+    timeout=120,
+    limits=httpx.Limits(max_keepalive_connections=32)
+)
+
+GEMINI_MODEL = "gemini-2.5-flash"
+
+async def ask_gemini(prompt: str, config: Optional[dict] = None) -> str:
     try:
-        response = client_gemini.models.generate_content(
-            model = "gemini-2.5-flash",
-            contents = prompt
+        response = await client_gemini.aio.models.generate_content(
+            model = GEMINI_MODEL,
+            contents = prompt,
+            config = config
         )
         return response.text.strip()
     except Exception as e:
@@ -31,58 +43,64 @@ class agentstate(TypedDict):
     audio_url: str
     summary: str
 
-prompt_explanation = PromptTemplate(
-    template='''
+EXPLANATION_INSTRUCTIONS = '''
         You are a knowledgeable teacher.
         - Explain the student's query in a clear and simple way, as if you are teaching in a classroom.
         - Keep the explanation focused and not too long.
         - Use everyday examples to make it relatable.
         - Avoid giving a step-by-step essay, instead explain naturally like a real teacher would.
-        
-        Student's query: {query}
-    ''',
-    input_variables=["query"]
-)
-
-prompt_summary = PromptTemplate(
-    template="""
-        Your task is to generate a short summary of the given text
-        in the form of **bullet points (like class notes)**.
 
+        Then summarize your explanation in the form of **bullet points (like class notes)**.
         - Use 4-5 concise bullet points.
         - Keep each point short (max 1-2 lines).
-        - Do not add new information that is not present in the original text.
+        - Do not add new information that is not present in the explanation.
 
-        Text: {text}
-    """,
-    input_variables=["text"]
-)
+        Return the explanation in "explanation" and the bullet points in "summary".
+'''
 
-def generate_explanation(state: agentstate) -> agentstate:
-    prompt_text = prompt_explanation.format(query=state['query'])
-    try:
-        response = ask_gemini(prompt_text)
-        state['explanation'] = response
-    except Exception as e:
-        state['explanation'] = f"Sorry, i couldn't generate explanation due to error: {e}"
-    return state
+# Only this part changes per request
+def query_prompt(query: str) -> str:
+    return f"""
+        Student's query: {query}
+    """
+
+# Asking for both fields in one structured response saves a second Gemini
+# round-trip per question.
+EXPLANATION_CONFIG = {
+    "response_mime_type": "application/json",
+    "response_schema": {
+        "type": "object",
+        "properties": {
+            "explanation": {"type": "string"},
+            "summary": {"type": "string"}
+        }
+    }
+}
 
-def generate_summary(state: agentstate) -> agentstate:
-    prompt_text = prompt_summary.format(text=state['explanation'])
+async def generate_explanation(state: agentstate) -> dict:
+    query_text = query_prompt(state['query'])
     try:
-        response = ask_gemini(prompt_text)
-        state['summary'] = response
+        response = await ask_gemini(EXPLANATION_INSTRUCTIONS + query_text, config=EXPLANATION_CONFIG)
+        data = json.loads(response)
+        return {
+            "explanation": data.get("explanation", ""),
+            "summary": data.get("summary", "")
+        }
     except Exception as e:
-        state['summary'] = f"Sorry, i couldn't generate summary due to error: {e}"
-    
-    return state
+        return {
+            "explanation": f"Sorry, i couldn't generate explanation due to error: {e}",
+            "summary": ""
+        }
+
+AUDIO_CHUNK_SIZE = 65536
+
+# Markdown headers and emphasis characters, stripped in one pass
+_MARKDOWN_RE = re.compile(r"#+|[*_`>-]")
 
 def clean_text(text: str) -> str:
-    text = re.sub(r"#+", "", text)
-    text = re.sub(r"[*_`>-]", "", text)
-    return text.strip()
+    return _MARKDOWN_RE.sub("", text).strip()
 
-def murf_stream_tts(state: dict) -> dict:
+async def murf_stream_tts(state: agentstate) -> dict:
     url = "https://api.murf.ai/v1/speech/generate"
     headers = {"api-key": MURFAI_API_KEY}
 
@@ -94,43 +112,55 @@ def murf_stream_tts(state: dict) -> dict:
         "sampleRate": 48000
     }
 
-    resp = requests.post(url, json=payload, headers=headers)
-
-    print("STATUS:", resp.status_code)
-    print("HEADERS:", resp.headers.get("Content-Type"))
-    print("BODY:", resp.text[:500])   # 🔴 first 500 chars of response
-
-    if resp.status_code != 200:
-        print(f"❌ Error: {resp.status_code}, {resp.text}")
-        state["audio_url"] = None
-        return state
-
-    # check if JSON instead of raw wav
-    if "application/json" in resp.headers.get("Content-Type", ""):
-        data = resp.json()
-        print("JSON Response:", data)
-        # usually Murf returns `audioFile` or `audio_url`
-        audio_url = data.get("audioFile") or data.get("audio_url")
-        if audio_url:
-            audio_resp = requests.get(audio_url)
-            state["audio_url"] = io.BytesIO(audio_resp.content)
-            return state
-
-    # if raw wav
-    audio_bytes = io.BytesIO(resp.content)
-    audio_bytes.seek(0)
-    state["audio_url"] = audio_bytes
-    return state
+    async with ASYNC_HTTP.stream("POST", url, json=payload, headers=headers) as resp:
+        print("STATUS:", resp.status_code)
+        print("HEADERS:", resp.headers.get("Content-Type"))
+
+        if resp.status_code != 200:
+            await resp.aread()
+            print(f"❌ Error: {resp.status_code}, {resp.text}")
+            return {"audio_url": None}
+
+        # check if JSON instead of raw wav
+        if "application/json" in resp.headers.get("Content-Type", ""):
+            await resp.aread()
+            data = resp.json()
+            print("JSON Response:", data)
+            # usually Murf returns `audioFile` or `audio_url`
+            audio_url = data.get("audioFile") or data.get("audio_url")
+            if not audio_url:
+                return {"audio_url": None}
+        else:
+            # if raw wav
+            return {"audio_url": await _stream_to_tmpfile(resp)}
+
+    async with ASYNC_HTTP.stream("GET", audio_url) as audio_resp:
+        if audio_resp.status_code != 200:
+            await audio_resp.aread()
+            print(f"❌ Audio download error: {audio_resp.status_code}, {audio_resp.text}")
+            return {"audio_url": None}
+        return {"audio_url": await _stream_to_tmpfile(audio_resp)}
+
+async def _stream_to_tmpfile(resp: httpx.Response) -> str:
+    """Write a streamed response body to a temp .wav file and return its path."""
+    fd, path = tempfile.mkstemp(suffix=".wav")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in resp.aiter_bytes(AUDIO_CHUNK_SIZE):
+                f.write(chunk)
+    except BaseException:
+        # don't leave a partial file behind if the stream breaks or is cancelled
+        os.remove(path)
+        raise
+    return path
 
 graph = StateGraph(agentstate)
 
 graph.add_node("generate_explanation", generate_explanation)
 graph.add_node("murf_stream_tts", murf_stream_tts)
-graph.add_node("generate_summary", generate_summary)
 
 graph.add_edge(START, "generate_explanation")
 graph.add_edge("generate_explanation", "murf_stream_tts")
-graph.add_edge("murf_stream_tts", "generate_summary")
-graph.add_edge("generate_summary", END)
+graph.add_edge("murf_stream_tts", END)
 
 workflow = graph.compile()
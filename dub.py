@@ -1,16 +1,22 @@
 import os
 import time
+import asyncio
 import io
 import re
-import requests
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, List, Dict
 from dotenv import load_dotenv
 import yt_dlp  # ✅ switched from pytube
 from murf import MurfDub
-from langchain_core.prompts import PromptTemplate
 from types import SimpleNamespace
 from google import genai
 import subprocess
+import shutil
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from starlette.concurrency import run_in_threadpool
+from core import ASYNC_HTTP
 
 load_dotenv()
 
@@ -27,10 +33,15 @@ def check_ffmpeg():
     except (subprocess.TimeoutExpired, FileNotFoundError, subprocess.SubprocessError):
         return False
 
+# Probed once at import rather than spawning ffmpeg on every download
+_HAS_FFMPEG = check_ffmpeg()
+
+GEMINI_MODEL = "gemini-2.0-flash"
+
 def ask_gemini(prompt: str) -> str:
     try:
         response = client_gemini.models.generate_content(
-            model = "gemini-2.0-flash",
+            model = GEMINI_MODEL,
             contents = prompt
         )
         return response.text.strip()
@@ -48,6 +59,33 @@ TARGET_LOCALES = [
 
 # ---------- YT download ----------
 
+# yt-dlp muxing and progress hooks are CPU-heavy; run downloads in separate
+# processes so concurrent downloads don't contend on the GIL. Workers come
+# from a forkserver (or spawn where that is unavailable, e.g. Windows)
+# because forking the threaded API process can deadlock.
+_DOWNLOAD_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+_DOWNLOAD_MP_CONTEXT = multiprocessing.get_context(_DOWNLOAD_START_METHOD)
+DOWNLOAD_PROCESSES = ProcessPoolExecutor(max_workers=4, mp_context=_DOWNLOAD_MP_CONTEXT)
+_download_pool_lock = threading.Lock()
+
+def _submit_to_download_pool(url: str) -> Future:
+    """Submit a download, replacing the pool if a crashed worker has broken it."""
+    global DOWNLOAD_PROCESSES
+    with _download_pool_lock:
+        try:
+            return DOWNLOAD_PROCESSES.submit(download_youtube_highest_mp4, url)
+        except BrokenProcessPool:
+            print("Download process pool is broken, starting a new one")
+            DOWNLOAD_PROCESSES.shutdown(wait=False)
+            DOWNLOAD_PROCESSES = ProcessPoolExecutor(max_workers=4, mp_context=_DOWNLOAD_MP_CONTEXT)
+            return DOWNLOAD_PROCESSES.submit(download_youtube_highest_mp4, url)
+
+# Fetch DASH/HLS fragments in parallel, and use aria2c when it is installed
+FRAGMENT_OPTS = {'concurrent_fragment_downloads': 8}
+if shutil.which('aria2c'):
+    FRAGMENT_OPTS['external_downloader'] = 'aria2c'
+    FRAGMENT_OPTS['external_downloader_args'] = {'aria2c': ['-x16', '-s16', '-k1M']}
+
 def clean_youtube_url(url: str) -> str:
     """Return base YouTube video URL (remove &t=, &si=, etc)."""
     if "&" in url:
@@ -72,7 +110,7 @@ def download_youtube_highest_mp4(url: str, out_dir: str = "downloads") -> str:
         expected_filename = f"%(title)s_{unique_id}.%(ext)s"
 
         # Check if ffmpeg is available
-        if not check_ffmpeg():
+        if not _HAS_FFMPEG:
             print("Warning: ffmpeg not found. Download may fail for some videos.")
             # Use simpler format that doesn't require ffmpeg
             ydl_opts = {
@@ -80,6 +118,7 @@ def download_youtube_highest_mp4(url: str, out_dir: str = "downloads") -> str:
                 'outtmpl': output_template,
                 'quiet': False,  # Show progress for debugging
                 'no_warnings': False,
+                **FRAGMENT_OPTS,
             }
         else:
             # Use ffmpeg for better quality
@@ -89,19 +128,13 @@ def download_youtube_highest_mp4(url: str, out_dir: str = "downloads") -> str:
                 'outtmpl': output_template,
                 'quiet': False,  # Show progress for debugging
                 'no_warnings': False,
+                **FRAGMENT_OPTS,
             }
 
         with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            # First extract info to check if video is available
-            try:
-                info = ydl.extract_info(url, download=False)
-                print(f"Video info extracted: {info.get('title', 'Unknown')}")
-            except Exception as info_error:
-                print(f"Failed to extract video info: {info_error}")
-                raise info_error
-            
-            # Now download
+            # Single extraction pass; availability errors surface here too
             info = ydl.extract_info(url, download=True)
+            print(f"Video downloaded: {info.get('title', 'Unknown')}")
             file_path = ydl.prepare_filename(info)
             
             # Handle file extension properly
@@ -138,111 +171,234 @@ def download_youtube_highest_mp4(url: str, out_dir: str = "downloads") -> str:
         print(f"Traceback: {traceback.format_exc()}")
         raise Exception(f"Failed to download Youtube video with yt-dlp: {e}")
 
+# YouTube video id -> downloaded mp4 path, so /api/download followed by
+# /api/dub (or repeated dubs) reuse one download. Lives in the parent process.
+# An entry expires VIDEO_CACHE_TTL after its path was last handed out, so a
+# file a caller is about to upload is never deleted from under it.
+VIDEO_CACHE: Dict[str, str] = {}
+VIDEO_CACHE_TTL = 6 * 3600
+_video_last_used: Dict[str, float] = {}
+
+# YouTube video id -> download still running, shared by every caller asking for it
+_video_downloads: Dict[str, Future] = {}
+_video_cache_lock = threading.RLock()  # reentrant: remember() may run inline
+
+_VIDEO_ID_RE = re.compile(r"(?:v=|youtu\.be/)([\w-]{11})")
+
+def youtube_video_id(url: str) -> Optional[str]:
+    match = _VIDEO_ID_RE.search(url)
+    return match.group(1) if match else None
+
+def _video_is_fresh(video_id: str, path: str) -> bool:
+    try:
+        return (
+            time.time() - _video_last_used.get(video_id, 0) < VIDEO_CACHE_TTL
+            and os.path.getsize(path) > 0
+        )
+    except OSError:
+        return False
+
+def _evict_video(video_id: str):
+    path = VIDEO_CACHE.pop(video_id, None)
+    _video_last_used.pop(video_id, None)
+    # stale downloads are removed from disk too, not just forgotten
+    if path:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+def _sweep_video_cache():
+    """Evict every expired entry, including videos nobody asks for again"""
+    for video_id, path in list(VIDEO_CACHE.items()):
+        if not _video_is_fresh(video_id, path):
+            _evict_video(video_id)
+
+def cached_video_path(video_id: str) -> Optional[str]:
+    path = VIDEO_CACHE.get(video_id)
+    if path is None:
+        return None
+    if not _video_is_fresh(video_id, path):
+        _evict_video(video_id)
+        return None
+    _video_last_used[video_id] = time.time()
+    return path
+
+def _follow(source: Future) -> Future:
+    """
+    A future that resolves with `source`. Each caller gets its own, so a caller
+    cancelling its wait can't cancel a download other callers are sharing.
+    """
+    follower = Future()
+
+    def copy(done: Future):
+        if follower.done():
+            return
+        if done.cancelled():
+            follower.cancel()
+        elif done.exception() is not None:
+            follower.set_exception(done.exception())
+        else:
+            follower.set_result(done.result())
+
+    source.add_done_callback(copy)
+    return follower
+
+def submit_youtube_download(url: str) -> Future:
+    """
+    Run download_youtube_highest_mp4 in the download process pool.
+    Reuses a recent download of the same video, or joins one still in progress.
+    """
+    video_id = youtube_video_id(url)
+    if not video_id:
+        return _follow(_submit_to_download_pool(url))
+
+    with _video_cache_lock:
+        path = cached_video_path(video_id)
+        if path:
+            print(f"Reusing downloaded video for {video_id}: {path}")
+            future = Future()
+            future.set_result(path)
+            return future
+
+        download = _video_downloads.get(video_id)
+        if download is None:
+            download = _submit_to_download_pool(url)
+            _video_downloads[video_id] = download
+
+            def remember(done: Future):
+                with _video_cache_lock:
+                    _video_downloads.pop(video_id, None)
+                    if not done.cancelled() and done.exception() is None:
+                        _sweep_video_cache()
+                        VIDEO_CACHE[video_id] = done.result()
+                        _video_last_used[video_id] = time.time()
+            download.add_done_callback(remember)
+        else:
+            print(f"Joining in-progress download for {video_id}")
+
+    return _follow(download)
+
 # ---------- Murf Dub API wrappers ----------
 
-def create_dub_job(file_path: str, target_locale: str, priority: str = "LOW") -> dict:
-    if target_locale not in TARGET_LOCALES:
-        raise ValueError(f"target_locale '{target_locale}' not in supported TARGET_LOCALES.")
-    
+def _check_dub_inputs(file_path: str, target_locales: List[str]):
+    for target_locale in target_locales:
+        if target_locale not in TARGET_LOCALES:
+            raise ValueError(f"target_locale '{target_locale}' not in supported TARGET_LOCALES.")
+
     # Verify file exists and is readable
     if not os.path.exists(file_path):
         raise FileNotFoundError(f"Video file not found: {file_path}")
-    
+
     if not os.path.isfile(file_path):
         raise ValueError(f"Path is not a file: {file_path}")
-    
-    try:
-        print(f"Creating dubbing job for file: {file_path}")
-        print(f"File size: {os.path.getsize(file_path)} bytes")
-        print(f"Target locale: {target_locale}")
-        
-        with open(file_path, "rb") as f:
-            res = murf_client.dubbing.jobs.create(
-                target_locales=[target_locale],
-                file_name=os.path.basename(file_path),
-                file=f,
-                priority=priority
-            )
 
-        print(f"MurfDub response: {res}")
-        
-        if isinstance(res, dict):
-            job_id = res.get("id") or res.get("job_id")
+def _job_from_response(res) -> SimpleNamespace:
+    print(f"MurfDub response: {res}")
+
+    if isinstance(res, dict):
+        job_id = res.get("id") or res.get("job_id")
+        print(f"Job created with ID: {job_id}")
+        return SimpleNamespace(
+            id=job_id,
+            raw=res
+        )
+    else:
+        try:
+            job_id = getattr(res, "id", None) or getattr(res, "job_id", None)
             print(f"Job created with ID: {job_id}")
             return SimpleNamespace(
                 id=job_id,
-                raw=res
+                raw=res.__dict__
             )
-        else:
-            try:
-                job_id = getattr(res, "id", None) or getattr(res, "job_id", None)
-                print(f"Job created with ID: {job_id}")
-                return SimpleNamespace(
-                    id=job_id,
-                    raw=res.__dict__
-                )
-            except Exception as e:
-                raise ValueError(f"Unexpected response format: {e}")
-    except Exception as e:
-        print(f"MurfDub API error: {e}")
-        print(f"Error type: {type(e)}")
-        import traceback
-        print(f"Traceback: {traceback.format_exc()}")
-        raise Exception(f"Failed to create dubbing job: {e}")
+        except Exception as e:
+            raise ValueError(f"Unexpected response format: {e}")
 
-def poll_job_until_complete(job_id: str, poll_interval: float = 3.0, timeout_sec: int = 1800) -> dict:
-    start = time.time()
-    attempt = 0
+def _submit_dub_job(file_path: str, target_locale: str, priority: str):
+    # The SDK sends file objects as streamed multipart, so hand it an open
+    # handle rather than the video's bytes to keep it out of memory.
+    with open(file_path, "rb", buffering=1 << 20) as f:
+        return murf_client.dubbing.jobs.create(
+            target_locales=[target_locale],
+            file_name=os.path.basename(file_path),
+            file=f,
+            priority=priority
+        )
 
-    while True:
-        try:
-            status = murf_client.dubbing.jobs.get_status(job_id=job_id)
-
-            if hasattr(status, "to_dict"):
-                status_dict = status.to_dict()
-            elif hasattr(status, "__dict__"):
-                status_dict = status.__dict__
-            else:
-                status_dict = dict(status)
-            
-            s = str(status_dict.get("status", "")).upper()
-            print(f"Job {job_id} status: {s} (attempt {attempt})")
-            
-            if s in ("COMPLETED", "FAILED", "ERROR"):
-                print(f"Job {job_id} final status: {s}")
-                if s == "FAILED" or s == "ERROR":
-                    print(f"Job {job_id} failed with details: {status_dict}")
-                return SimpleNamespace(**status_dict)
-            
-            if time.time() - start > timeout_sec:
-                raise TimeoutError("Polling timed out.")
+async def create_dub_jobs(
+    file_path: str,
+    target_locales: List[str],
+    priority: str = "LOW",
+    submit_limit: Optional[asyncio.Semaphore] = None
+) -> Tuple[List[SimpleNamespace], Dict[str, str]]:
+    """
+    Creates one dubbing job per locale for the same video.
+    The job submissions run concurrently, each streaming the file from disk.
+    Returns the jobs that were created and an error message per failed locale,
+    so jobs that did get created (and cost credits) are never dropped.
+    `submit_limit`, if given, caps how many submissions run at once.
+    """
+    _check_dub_inputs(file_path, target_locales)
 
-            attempt+=1
-            sleep_time = min(poll_interval * (1 + attempt // 10), 15)
-            time.sleep(sleep_time)
-        except Exception as e:
-            print(f"Error polling job {job_id}: {e}")
-            raise
+    print(f"Creating {len(target_locales)} dubbing job(s) for file: {file_path}")
+    print(f"Target locales: {target_locales}")
+
+    results = await asyncio.gather(*[
+        _create_locale_job(file_path, target_locale, priority, submit_limit)
+        for target_locale in target_locales
+    ], return_exceptions=True)
+
+    jobs = []
+    errors = {}
+    for target_locale, result in zip(target_locales, results):
+        if isinstance(result, Exception):
+            print(f"MurfDub API error for {target_locale}: {result}")
+            errors[target_locale] = f"Failed to create dubbing job: {result}"
+        else:
+            jobs.append(result)
+    return jobs, errors
 
-def download_url_bytes(url: str) -> bytes:
-    r = requests.get(url, timeout=120)
+async def _create_locale_job(
+    file_path: str,
+    target_locale: str,
+    priority: str,
+    submit_limit: Optional[asyncio.Semaphore]
+) -> SimpleNamespace:
+    if submit_limit is None:
+        res = await run_in_threadpool(_submit_dub_job, file_path, target_locale, priority)
+    else:
+        async with submit_limit:
+            res = await run_in_threadpool(_submit_dub_job, file_path, target_locale, priority)
+    return _job_from_response(res)
+
+def job_status_to_dict(status) -> dict:
+    if hasattr(status, "to_dict"):
+        return status.to_dict()
+    elif hasattr(status, "__dict__"):
+        return status.__dict__
+    else:
+        return dict(status)
+
+async def download_url_bytes(url: str) -> bytes:
+    r = await ASYNC_HTTP.get(url)
     r.raise_for_status()
     return r.content
 
 # ---------- Subtitles helpers ----------
 
+# Cue index lines and "00:00:01,000 --> 00:00:02,000" timing lines
+_SRT_SKIP_RE = re.compile(r"^\d+\s*$|^\d{2}:\d{2}:\d{2},\d{3}\s*-->\s*\d{2}:\d{2}:\d{2},\d{3}\s*$")
+
 def srt_to_plain_text(srt_bytes: bytes) -> str:
     text = srt_bytes.decode("utf-8", errors="ignore")
-    text = re.sub(r"\d+\s*\n\d{2}:\d{2}:\d{2},\d{3}\s*-->\s*\d{2}:\d{2}:\d{2},\d{3}", "", text)
-    text = re.sub(r"\n{2,}", "\n", text)
-    text = re.sub(r"(?m)^\d+\s*$", "", text)
-    text = text.strip()
-    return text
+    return "\n".join(
+        line for line in text.splitlines()
+        if line.strip() and not _SRT_SKIP_RE.match(line)
+    ).strip()
 
 # ---------- Notes via LLM ----------
 
-NOTES_PROMPT = PromptTemplate(
-    template="""
+NOTES_INSTRUCTIONS = """
 You are a helpful teacher. Create compact class notes in bullet points from the following transcript text.
 
 Rules:
@@ -250,19 +406,20 @@ Rules:
 - Keep each bullet <= 2 lines.
 - No new facts not present in text.
 - Use plain language.
+"""
 
+def notes_prompt(text: str) -> str:
+    return f"""
 Transcript:
 {text}
 
 Notes:
-""",
-    input_variables=["text"]
-)
+"""
 
 def generate_notes_from_text(text: str) -> str:
-    prompt_text = NOTES_PROMPT.format(text=text)
+    prompt_text = notes_prompt(text)
     try:
-        resp = ask_gemini(prompt_text)
+        resp = ask_gemini(NOTES_INSTRUCTIONS + prompt_text)
         return resp.strip()
     except Exception as e:
         return f"- (Error generating notes) {e}"
@@ -1,17 +1,25 @@
 import os
 import time
-import io
 import sys
+import asyncio
 import threading
+from concurrent.futures import ThreadPoolExecutor
 import uuid
+import re
+import shutil
+import hashlib
+from cachetools import TTLCache
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi import FastAPI
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import FileResponse, JSONResponse
+from starlette.concurrency import run_in_threadpool
 from pydantic import BaseModel
-from typing import Optional, Dict
-from core import workflow, agentstate
+from typing import Optional, Dict, List, Set
+from core import workflow, agentstate, ASYNC_HTTP
 from dub import (
-    create_dub_job,
-    poll_job_until_complete,
+    create_dub_jobs,
+    TARGET_LOCALES,
+    job_status_to_dict,
     download_url_bytes,
     srt_to_plain_text,
     generate_notes_from_text
@@ -27,16 +35,111 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Global storage for download progress
-download_progress: Dict[str, Dict] = {}
+@app.on_event("shutdown")
+async def close_http_client():
+    await ASYNC_HTTP.aclose()
+
+# Global storage for download progress; entries expire an hour after their
+# last update. Written from download threads, so always go through the lock.
+download_progress: TTLCache = TTLCache(maxsize=10_000, ttl=3600)
+_progress_lock = threading.Lock()
+
+def _progress_snapshot() -> Dict[str, Dict]:
+    with _progress_lock:
+        return {k: dict(v) for k, v in download_progress.items()}
+
+# Background download workers; beyond DOWNLOAD_QUEUE_LIMIT running or queued
+# downloads, /api/download answers 429.
+DOWNLOAD_POOL = ThreadPoolExecutor(max_workers=8)
+DOWNLOAD_QUEUE_LIMIT = 32
+_download_slots = threading.BoundedSemaphore(DOWNLOAD_QUEUE_LIMIT)
+
+# Latest known status/result of each dubbing job, kept up to date by _poll_loop;
+# entries expire an hour after their last update.
+dub_jobs: TTLCache = TTLCache(maxsize=10_000, ttl=3600)
+_background_tasks: Set[asyncio.Task] = set()
+
+# batch id -> one entry per video in a /api/dub_bulk request
+dub_batches: TTLCache = TTLCache(maxsize=1000, ttl=86400)
+
+# Generated TTS audio, one WAV per cached answer
+AUDIO_DIR = "audio_cache"
+
+@app.on_event("startup")
+def reset_audio_dir():
+    # ASK_CACHE starts out empty, so audio left over from a previous run is unreachable
+    shutil.rmtree(AUDIO_DIR, ignore_errors=True)
+    os.makedirs(AUDIO_DIR, exist_ok=True)
+
+AUDIO_ID_RE = re.compile(r"[0-9a-f]{32}")
+
+def _audio_path(audio_id: str) -> str:
+    return os.path.join(AUDIO_DIR, f"{audio_id}.wav")
+
+class AskCache(TTLCache):
+    """TTLCache that deletes an answer's audio file when the answer is evicted"""
+
+    def popitem(self):
+        key, value = super().popitem()
+        _discard_audio(value["audio_id"])
+        return key, value
+
+    def expire(self, time=None):
+        expired = super().expire(time)
+        for _, value in expired:
+            _discard_audio(value["audio_id"])
+        return expired
+
+def _discard_audio(audio_id: str):
+    try:
+        os.remove(_audio_path(audio_id))
+    except FileNotFoundError:
+        pass
+
+def _audio_size(value: Dict) -> int:
+    return os.path.getsize(_audio_path(value["audio_id"]))
+
+# sha256 of the normalized query -> {"explanation", "summary", "audio_id"};
+# the audio file belongs to the entry and is removed along with it, so the
+# cache is bounded by the bytes of audio on disk rather than by entry count
+ASK_CACHE_MAX_BYTES = 1 << 30
+ASK_CACHE = AskCache(maxsize=ASK_CACHE_MAX_BYTES, ttl=86400, getsizeof=_audio_size)
+
+def ask_cache_key(query: str) -> str:
+    return hashlib.sha256(query.strip().lower().encode()).hexdigest()
+
+# cache key -> answer being generated for that query right now
+INFLIGHT: Dict[str, asyncio.Task] = {}
 
 class AskIn(BaseModel):
     query: str
 
 @app.post("/api/ask")
 async def api_ask(payload: AskIn):
+    key = ask_cache_key(payload.query)
+    cached = ASK_CACHE.get(key)
+    if cached and os.path.exists(_audio_path(cached["audio_id"])):
+        return cached
+
+    # Identical questions already being answered share the same upstream calls.
+    # The work runs as its own task so a cancelled caller can't fail the others.
+    task = INFLIGHT.get(key)
+    if task is None:
+        task = asyncio.create_task(_answer_query(payload.query, key))
+        INFLIGHT[key] = task
+        task.add_done_callback(lambda done: _finish_inflight(key, done))
+    return await asyncio.shield(task)
+
+def _finish_inflight(key: str, task: asyncio.Task):
+    if INFLIGHT.get(key) is task:
+        del INFLIGHT[key]
+    # mark the exception as retrieved in case every caller went away
+    if not task.cancelled():
+        task.exception()
+
+async def _answer_query(query: str, key: str) -> Dict:
     state: agentstate = {
-        "query": payload.query,
+        "query": query,
         "lang": "english",
         "explanation": "",
         "audio_url": None,
@@ -47,52 +150,85 @@ async def api_ask(payload: AskIn):
 
     explanation = result.get("explanation", "") or ""
     summary = result.get("summary", "") or ""
-    audio_b64: Optional[str] = None
-    audio_obj = result.get("audio_url", None)
-    if isinstance(audio_obj, io.BytesIO):
-        import base64
-        audio_b64 = base64.b64encode(audio_obj.read()).decode("utf-8")
+    audio_path = result.get("audio_url", None)
+    # Failed generations (they come back without a summary) are neither cached
+    # nor given an audio file under the cache key
+    if audio_path is None or not summary:
+        if audio_path is not None:
+            os.remove(audio_path)
+        return {
+            "explanation": explanation,
+            "summary": summary,
+            "audio_id": None
+        }
 
-    return {
+    # Serve the audio from a separate endpoint instead of inlining it as base64.
+    # Every generation gets a fresh id, so a URL always refers to the same
+    # bytes and evicting an old entry can never delete a newer file.
+    audio_id = uuid.uuid4().hex
+    await run_in_threadpool(shutil.move, audio_path, _audio_path(audio_id))
+    response = {
         "explanation": explanation,
         "summary": summary,
-        "audio_b64": audio_b64
+        "audio_id": audio_id
     }
+    ASK_CACHE[key] = response
+    return response
+
+@app.get("/api/audio/{audio_id}")
+async def api_audio(audio_id: str):
+    """Serve TTS audio produced by /api/ask"""
+    path = _audio_path(audio_id)
+    if not AUDIO_ID_RE.fullmatch(audio_id) or not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="Audio not found")
+    # A given audio id is never rewritten, so browsers can reuse the file on replays
+    return FileResponse(
+        path,
+        media_type="audio/wav",
+        headers={"Cache-Control": "private, max-age=3600"}
+    )
 
 class DubIn(BaseModel):
     youtube_url: str
-    target_locale: str
+    target_locale: Optional[str] = None
+    target_locales: Optional[List[str]] = None
+
+def _target_locales(payload: DubIn) -> List[str]:
+    return payload.target_locales or ([payload.target_locale] if payload.target_locale else [])
 
 class DownloadIn(BaseModel):
     youtube_url: str
 
+def _set_progress(download_id: str, **fields):
+    """Merge fields into a download's progress entry under the lock"""
+    with _progress_lock:
+        download_progress[download_id] = {**download_progress.get(download_id, {}), **fields}
+
 def download_video_async(download_id: str, youtube_url: str):
     """Download video in background thread"""
     try:
-        download_progress[download_id] = {
-            "status": "downloading",
-            "progress": 0,
-            "message": "Starting download...",
-            "file_path": None,
-            "error": None
-        }
+        _set_progress(
+            download_id,
+            status="downloading",
+            progress=0,
+            message="Starting download...",
+            file_path=None,
+            error=None
+        )
         
-        from dub import download_youtube_highest_mp4
+        from dub import submit_youtube_download
         
         # Update progress
-        download_progress[download_id]["message"] = "Initializing download..."
-        download_progress[download_id]["progress"] = 10
+        _set_progress(download_id, message="Initializing download...", progress=10)
         
         # Download the video
-        download_progress[download_id]["message"] = "Downloading video from YouTube..."
-        download_progress[download_id]["progress"] = 30
+        _set_progress(download_id, message="Downloading video from YouTube...", progress=30)
         
         # Update progress during download
-        download_progress[download_id]["message"] = "Downloading video from YouTube..."
-        download_progress[download_id]["progress"] = 50
+        _set_progress(download_id, message="Downloading video from YouTube...", progress=50)
         
         try:
-            mp4_path = download_youtube_highest_mp4(youtube_url)
+            mp4_path = submit_youtube_download(youtube_url).result()
             
             # Verify the file exists and has content
             if not os.path.exists(mp4_path):
@@ -105,43 +241,58 @@ def download_video_async(download_id: str, youtube_url: str):
             print(f"Download completed successfully: {mp4_path} ({file_size} bytes)")
             
             # Update progress
-            download_progress[download_id]["message"] = "Download completed!"
-            download_progress[download_id]["progress"] = 100
-            download_progress[download_id]["status"] = "completed"
-            download_progress[download_id]["file_path"] = mp4_path
+            _set_progress(
+                download_id,
+                message="Download completed!",
+                progress=100,
+                status="completed",
+                file_path=mp4_path
+            )
             print(f"Download progress updated for {download_id}: {mp4_path}")
             
         except Exception as download_error:
             # Handle specific download errors
             error_msg = str(download_error)
             if "Invalid data found when processing input" in error_msg:
-                download_progress[download_id]["message"] = "Download failed: Video format not supported"
-                download_progress[download_id]["error"] = "The video format is not supported or the video is corrupted. Please try a different YouTube video."
+                message = "Download failed: Video format not supported"
+                error = "The video format is not supported or the video is corrupted. Please try a different YouTube video."
             elif "Video unavailable" in error_msg:
-                download_progress[download_id]["message"] = "Download failed: Video unavailable"
-                download_progress[download_id]["error"] = "This video is not available for download. It may be private, deleted, or region-restricted."
+                message = "Download failed: Video unavailable"
+                error = "This video is not available for download. It may be private, deleted, or region-restricted."
             elif "Sign in" in error_msg or "login" in error_msg.lower():
-                download_progress[download_id]["message"] = "Download failed: Age-restricted video"
-                download_progress[download_id]["error"] = "This video is age-restricted and requires authentication to download."
+                message = "Download failed: Age-restricted video"
+                error = "This video is age-restricted and requires authentication to download."
             else:
-                download_progress[download_id]["message"] = f"Download failed: {error_msg}"
-                download_progress[download_id]["error"] = error_msg
+                message = f"Download failed: {error_msg}"
+                error = error_msg
             
-            download_progress[download_id]["status"] = "failed"
-            download_progress[download_id]["progress"] = 0
+            _set_progress(download_id, message=message, error=error, status="failed", progress=0)
         
     except Exception as e:
-        download_progress[download_id] = {
-            "status": "failed",
-            "progress": 0,
-            "message": f"Download failed: {str(e)}",
-            "file_path": None,
-            "error": str(e)
-        }
+        _set_progress(
+            download_id,
+            status="failed",
+            progress=0,
+            message=f"Download failed: {str(e)}",
+            file_path=None,
+            error=str(e)
+        )
 
 @app.post("/api/download")
-def api_download_start(payload: DownloadIn):
+async def api_download_start(payload: DownloadIn):
     """Start YouTube download and return download ID for tracking"""
+    # Reject instead of queueing without bound when the pool is saturated
+    if not _download_slots.acquire(blocking=False):
+        return JSONResponse(
+            status_code=429,
+            content={
+                "error": "Too many downloads in progress",
+                "error_code": "TOO_MANY_DOWNLOADS",
+                "details": "Please try again shortly"
+            }
+        )
+
+    submitted = False
     try:
         print(f"Starting download for URL: {payload.youtube_url}")
         
@@ -149,21 +300,19 @@ def api_download_start(payload: DownloadIn):
         download_id = str(uuid.uuid4())
         
         # Initialize progress tracking
-        download_progress[download_id] = {
-            "status": "starting",
-            "progress": 0,
-            "message": "Initializing...",
-            "file_path": None,
-            "error": None
-        }
-        
-        # Start download in background thread
-        thread = threading.Thread(
-            target=download_video_async,
-            args=(download_id, payload.youtube_url)
+        _set_progress(
+            download_id,
+            status="starting",
+            progress=0,
+            message="Initializing...",
+            file_path=None,
+            error=None
         )
-        thread.daemon = True
-        thread.start()
+        
+        # Start download on the shared pool
+        future = DOWNLOAD_POOL.submit(download_video_async, download_id, payload.youtube_url)
+        future.add_done_callback(lambda _: _download_slots.release())
+        submitted = True
         
         return {
             "download_id": download_id,
@@ -171,6 +320,8 @@ def api_download_start(payload: DownloadIn):
             "status": "started"
         }
     except Exception as e:
+        if not submitted:
+            _download_slots.release()
         import traceback
         print(f"Error in download start: {e}")
         print(traceback.format_exc())
@@ -181,26 +332,41 @@ def api_download_start(payload: DownloadIn):
         }
 
 @app.get("/api/download_status")
-def api_download_status(download_id: str):
+async def api_download_status(download_id: str):
     """Get download progress status"""
-    if download_id not in download_progress:
-        return {"error": "Download ID not found"}
-    
-    return download_progress[download_id]
+    with _progress_lock:
+        progress = download_progress.get(download_id)
+        if progress is None:
+            return {"error": "Download ID not found"}
+        return dict(progress)
 
 @app.post("/api/dub")
-def api_dub_start(payload: DubIn):
+async def api_dub_start(payload: DubIn):
     try:
         print(f"Starting dubbing for URL: {payload.youtube_url}")
-        from dub import create_dub_job
+        target_locales = _target_locales(payload)
+        if not target_locales:
+            return {
+                "error": "No target locale given",
+                "error_code": "INVALID_LOCALE",
+                "details": "Provide target_locale or target_locales"
+            }
+        # Reject bad locales before spending a download on them
+        unsupported = [locale for locale in target_locales if locale not in TARGET_LOCALES]
+        if unsupported:
+            return {
+                "error": "Unsupported target locale",
+                "error_code": "INVALID_LOCALE",
+                "details": f"Not in supported TARGET_LOCALES: {unsupported}"
+            }
         
         # SIMPLE APPROACH: Just download the video directly in this endpoint
         # This eliminates the race condition completely
         print("Downloading video directly for dubbing...")
-        from dub import download_youtube_highest_mp4
+        from dub import submit_youtube_download
         
         try:
-            mp4_path = download_youtube_highest_mp4(payload.youtube_url)
+            mp4_path = await asyncio.wrap_future(submit_youtube_download(payload.youtube_url))
             print(f"Video downloaded successfully: {mp4_path}")
         except Exception as download_error:
             print(f"Download failed: {download_error}")
@@ -210,12 +376,23 @@ def api_dub_start(payload: DubIn):
                 "details": str(download_error)
             }
         
-        # Create the dubbing job
-        print("Creating dubbing job...")
+        # Create one dubbing job per locale
+        print("Creating dubbing job(s)...")
         try:
-            job = create_dub_job(file_path=mp4_path, target_locale=payload.target_locale)
-            print(f"Job created with ID: {job.id}")
-            return {"job_id": job.id, "status": "success"}
+            jobs, errors = await create_dub_jobs(file_path=mp4_path, target_locales=target_locales)
+            job_ids = [job.id for job in jobs]
+            print(f"Jobs created with IDs: {job_ids}")
+            # Poll every job that was created, even if other locales failed
+            for job_id in job_ids:
+                _start_dub_polling(job_id)
+            if not job_ids:
+                raise Exception("; ".join(errors.values()))
+            return {
+                "job_id": job_ids[0],
+                "job_ids": job_ids,
+                "errors": errors,
+                "status": "partial" if errors else "success"
+            }
         except Exception as job_error:
             print(f"Job creation failed: {job_error}")
             # Check if it's a credit-related error
@@ -243,26 +420,266 @@ def api_dub_start(payload: DubIn):
         }
 
 
+DUB_FINAL_STATUSES = ("completed", "failed", "error")
+DUB_POLL_BACKOFF = [2, 3, 5, 8, 13, 15]
+DUB_POLL_TIMEOUT = 1800
+
+def _is_client_error(e: Exception) -> bool:
+    """True for Murf API errors that retrying won't fix (unknown job id, bad request, ...)"""
+    status_code = getattr(e, "status_code", None)
+    return isinstance(status_code, int) and 400 <= status_code < 500
+
+async def _get_dub_job(job_id: str) -> Dict:
+    """Return the registry entry for a job, starting a poller if we don't know it yet"""
+    job = dub_jobs.get(job_id)
+    if job is not None:
+        return job
+
+    # Confirm the id with Murf once before committing a 30 minute poller to it
+    from dub import murf_client
+    try:
+        status = await run_in_threadpool(murf_client.dubbing.jobs.get_status, job_id=job_id)
+    except Exception as e:
+        print(f"Error looking up job {job_id}: {e}")
+        if _is_client_error(e):
+            raise HTTPException(status_code=404, detail="Job ID not found")
+        raise HTTPException(status_code=502, detail=str(e))
+
+    job = dub_jobs.get(job_id)
+    if job is not None:
+        return job
+
+    # Use the status we just fetched; finished jobs need no poller at all
+    status_dict = job_status_to_dict(status)
+    s = str(status_dict.get("status", "")).lower()
+    if s in DUB_FINAL_STATUSES:
+        job = await _dub_result(job_id, status, status_dict)
+        dub_jobs[job_id] = job
+        return job
+
+    _start_dub_polling(job_id, s or "queued")
+    return dub_jobs[job_id]
+
+def _start_dub_polling(job_id: str, status: str = "queued") -> asyncio.Task:
+    dub_jobs[job_id] = {"status": status}
+    task = asyncio.create_task(_poll_loop(job_id))
+    # keep a reference so the task isn't garbage collected mid-poll
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+    return task
+
+async def _poll_loop(job_id: str) -> Dict:
+    """Poll Murf for one job with backoff, publish results into dub_jobs and return the final one"""
+    from dub import murf_client
+    start = time.time()
+    attempt = 0
+
+    while time.time() - start < DUB_POLL_TIMEOUT:
+        await asyncio.sleep(DUB_POLL_BACKOFF[min(attempt, len(DUB_POLL_BACKOFF) - 1)])
+        attempt += 1
+        try:
+            status = await run_in_threadpool(murf_client.dubbing.jobs.get_status, job_id=job_id)
+            status_dict = job_status_to_dict(status)
+            s = str(status_dict.get("status", "")).lower()
+            print(f"Job {job_id} status: {s} (attempt {attempt})")
+
+            if s in DUB_FINAL_STATUSES:
+                result = await _dub_result(job_id, status, status_dict)
+                dub_jobs[job_id] = result
+                return result
+            # reassign rather than mutate so the entry's TTL restarts
+            dub_jobs[job_id] = {**dub_jobs.get(job_id, {}), "status": s}
+        except Exception as e:
+            if _is_client_error(e):
+                print(f"Job {job_id} rejected by Murf, stopping poll: {e}")
+                dub_jobs.pop(job_id, None)
+                return {
+                    "status": "error",
+                    "error": str(e),
+                    "error_code": "JOB_REJECTED"
+                }
+            import traceback
+            print(f"Error polling job {job_id}: {e}")
+            print(traceback.format_exc())
+
+    result = {
+        "status": "error",
+        "error": "Polling timed out.",
+        "error_code": "POLL_TIMEOUT"
+    }
+    dub_jobs[job_id] = result
+    return result
+
+async def _dub_result(job_id: str, status, status_dict: Dict) -> Dict:
+    s = str(status_dict.get("status", "")).lower()
+
+    # Job failed - return detailed error information
+    if s in ("failed", "error"):
+        print(f"Job {job_id} failed with details: {status_dict}")
+        return {
+            "status": s,
+            "error": status_dict.get("failure_reason", "Unknown error"),
+            "error_code": status_dict.get("failure_code", "UNKNOWN"),
+            "credits_remaining": status_dict.get("credits_remaining", 0)
+        }
+
+    # Job is complete, get the results
+    print(f"Job {job_id} status details: {status_dict}")
+
+    # Extract video URL from download_details
+    dubbed_video_url = None
+    subtitles_url = None
+
+    if hasattr(status, "download_details") and status.download_details:
+        # Get the first download detail (usually the main dubbed video)
+        download_detail = status.download_details[0]
+        if hasattr(download_detail, "download_url"):
+            dubbed_video_url = download_detail.download_url
+        if hasattr(download_detail, "download_srt_url"):
+            subtitles_url = download_detail.download_srt_url
+
+    print(f"Extracted video URL: {dubbed_video_url}")
+    print(f"Extracted subtitles URL: {subtitles_url}")
+
+    notes = None
+    if subtitles_url:
+        try:
+            srt_bytes = await download_url_bytes(subtitles_url)
+            transcript_text = srt_to_plain_text(srt_bytes)
+            notes = await run_in_threadpool(generate_notes_from_text, transcript_text)
+        except Exception as e:
+            notes = f"- (Could not generate notes) {e}"
+
+    return {
+        "status": s,
+        "dubbed_video_url": dubbed_video_url,
+        "subtitles_url": subtitles_url,
+        "notes": notes
+    }
+
+# Bulk dubbing: at most 4 YouTube downloads and 8 Murf job submissions
+# (one per locale) at once across all batches, to stay within yt-dlp and Murf rate limits.
+DUB_BULK_DOWNLOADS = asyncio.Semaphore(4)
+DUB_BULK_SUBMITS = asyncio.Semaphore(8)
+
+@app.post("/api/dub_bulk")
+async def api_dub_bulk(payload: List[DubIn]):
+    """Download and dub many videos; returns a batch ID for /api/dub_bulk_status"""
+    # Reject bad locales up front so no video is downloaded for nothing
+    invalid = [
+        i for i, video in enumerate(payload)
+        if not _target_locales(video)
+        or any(locale not in TARGET_LOCALES for locale in _target_locales(video))
+    ]
+    if invalid:
+        return {
+            "error": "Missing or unsupported target locale",
+            "error_code": "INVALID_LOCALE",
+            "details": f"Check target_locale(s) of items {invalid}"
+        }
+
+    batch_id = str(uuid.uuid4())
+    items = [
+        {
+            "youtube_url": video.youtube_url,
+            "target_locales": _target_locales(video),
+            "status": "queued",
+            "job_ids": [],
+            "results": {},
+            "errors": {},
+            "error": None
+        }
+        for video in payload
+    ]
+    dub_batches[batch_id] = items
+
+    task = asyncio.create_task(_run_dub_batch(items))
+    _background_tasks.add(task)
+    task.add_done_callback(_background_tasks.discard)
+
+    return {"batch_id": batch_id, "count": len(items), "status": "started"}
+
+async def _run_dub_batch(items: List[Dict]):
+    await asyncio.gather(*[_run_dub_batch_item(item) for item in items])
+
+async def _run_dub_batch_item(item: Dict):
+    from dub import submit_youtube_download
+    try:
+        async with DUB_BULK_DOWNLOADS:
+            item["status"] = "downloading"
+            mp4_path = await asyncio.wrap_future(submit_youtube_download(item["youtube_url"]))
+
+        item["status"] = "submitting"
+        jobs, errors = await create_dub_jobs(
+            file_path=mp4_path,
+            target_locales=item["target_locales"],
+            submit_limit=DUB_BULK_SUBMITS
+        )
+
+        item["job_ids"] = [job.id for job in jobs]
+        item["errors"] = errors
+        if not item["job_ids"]:
+            raise Exception("; ".join(errors.values()))
+        item["status"] = "submitted"
+        polls = [_start_dub_polling(job_id) for job_id in item["job_ids"]]
+        # dub_jobs entries expire; keep each final result with the batch itself
+        for job_id, result in zip(item["job_ids"], await asyncio.gather(*polls)):
+            item["results"][job_id] = result
+    except Exception as e:
+        print(f"Bulk dub failed for {item['youtube_url']}: {e}")
+        item["status"] = "failed"
+        item["error"] = str(e)
+
+@app.get("/api/dub_bulk_status")
+async def api_dub_bulk_status(batch_id: str):
+    """Aggregate per-job status for a /api/dub_bulk batch"""
+    items = dub_batches.get(batch_id)
+    if items is None:
+        return {"error": "Batch ID not found"}
+
+    results = []
+    done = 0
+    for item in items:
+        jobs = [
+            dict(item["results"].get(job_id) or dub_jobs.get(job_id) or {"status": "unknown"}, job_id=job_id)
+            for job_id in item["job_ids"]
+        ]
+        finished = item["status"] == "failed" or (
+            item["status"] == "submitted" and all(job["status"] in DUB_FINAL_STATUSES for job in jobs)
+        )
+        done += finished
+        summary = {key: value for key, value in item.items() if key != "results"}
+        results.append({**summary, "jobs": jobs})
+
+    return {
+        "batch_id": batch_id,
+        "status": "completed" if done == len(items) else "in_progress",
+        "done": done,
+        "total": len(items),
+        "items": results
+    }
+
 @app.get("/api/debug")
-def api_debug():
+async def api_debug():
     """Debug endpoint to check system status"""
+    downloads_exists = os.path.exists("downloads")
     return {
         "murf_api_key_set": bool(os.getenv("MURFDUB_API_KEY")),
-        "downloads_dir_exists": os.path.exists("downloads"),
-        "downloads_dir_files": os.listdir("downloads") if os.path.exists("downloads") else [],
+        "downloads_dir_exists": downloads_exists,
+        "downloads_dir_files": await run_in_threadpool(os.listdir, "downloads") if downloads_exists else [],
         "current_dir": os.getcwd(),
         "python_version": sys.version,
         "server_status": "running",
-        "download_progress": download_progress
+        "download_progress": _progress_snapshot()
     }
 
 @app.get("/api/health")
-def api_health():
+async def api_health():
     """Simple health check endpoint"""
     return {"status": "ok", "message": "Server is running"}
 
 @app.get("/api/test_murf")
-def api_test_murf():
+async def api_test_murf():
     """Test MurfDub API connection"""
     try:
         from dub import murf_client
@@ -274,126 +691,17 @@ def api_test_murf():
         return {"status": "error", "message": str(e)}
 
 @app.get("/api/dub_complete")
-def api_dub_complete(job_id: str):
+async def api_dub_complete(job_id: str):
     """Get complete job results when job is finished"""
-    try:
-        # Use the polling function to wait for completion
-        status = poll_job_until_complete(job_id=job_id)
-        s = str(getattr(status, "status", "")).upper()
-
-        if s not in ("COMPLETED", "FAILED", "ERROR"):
-            return {"status": s.lower(), "message": "Job still in progress"}
-
-        # Job is complete, get the results
-        print(f"Job {job_id} status details: {status.__dict__}")
-        
-        # Extract video URL from download_details
-        dubbed_video_url = None
-        subtitles_url = None
-        
-        if hasattr(status, "download_details") and status.download_details:
-            # Get the first download detail (usually the main dubbed video)
-            download_detail = status.download_details[0]
-            if hasattr(download_detail, "download_url"):
-                dubbed_video_url = download_detail.download_url
-            if hasattr(download_detail, "download_srt_url"):
-                subtitles_url = download_detail.download_srt_url
-        
-        print(f"Extracted video URL: {dubbed_video_url}")
-        print(f"Extracted subtitles URL: {subtitles_url}")
-
-        notes = None
-        if subtitles_url:
-            try:
-                srt_bytes = download_url_bytes(subtitles_url)
-                transcript_text = srt_to_plain_text(srt_bytes)
-                notes = generate_notes_from_text(transcript_text)
-            except Exception as e:
-                notes = f"- (Could not generate notes) {e}"
-
-        return {
-            "status": s.lower(),
-            "dubbed_video_url": dubbed_video_url,
-            "subtitles_url": subtitles_url,
-            "notes": notes
-        }
-    except Exception as e:
-        import traceback
-        print(f"Error in dub complete: {e}")
-        print(traceback.format_exc())
-        from fastapi import HTTPException
-        raise HTTPException(status_code=500, detail=str(e))
+    job = await _get_dub_job(job_id)
+    if job["status"] not in DUB_FINAL_STATUSES:
+        return JSONResponse(
+            status_code=202,
+            content={"status": job["status"], "message": "Job still in progress"}
+        )
+    return job
 
 @app.get("/api/dub_status")
-def api_dub_status(job_id: str):
-    try:
-        # Just get the current status without waiting
-        from dub import murf_client
-        status = murf_client.dubbing.jobs.get_status(job_id=job_id)
-
-        if hasattr(status, "to_dict"):
-            status_dict = status.to_dict()
-        elif hasattr(status, "__dict__"):
-            status_dict = status.__dict__
-        else:
-            status_dict = dict(status)
-        
-        s = str(status_dict.get("status", "")).upper()
-        print(f"Job {job_id} current status: {s}")
-        
-        # If job is still in progress, just return status
-        if s not in ("COMPLETED", "FAILED", "ERROR"):
-            return {"status": s.lower()}
-
-        # Job failed - return detailed error information
-        if s in ("FAILED", "ERROR"):
-            failure_reason = status_dict.get("failure_reason", "Unknown error")
-            failure_code = status_dict.get("failure_code", "UNKNOWN")
-            credits_remaining = status_dict.get("credits_remaining", 0)
-            
-            return {
-                "status": s.lower(),
-                "error": failure_reason,
-                "error_code": failure_code,
-                "credits_remaining": credits_remaining
-            }
-
-        # Job is complete, get the results
-        print(f"Job {job_id} status details: {status_dict}")
-        
-        # Extract video URL from download_details
-        dubbed_video_url = None
-        subtitles_url = None
-        
-        if hasattr(status, "download_details") and status.download_details:
-            # Get the first download detail (usually the main dubbed video)
-            download_detail = status.download_details[0]
-            if hasattr(download_detail, "download_url"):
-                dubbed_video_url = download_detail.download_url
-            if hasattr(download_detail, "download_srt_url"):
-                subtitles_url = download_detail.download_srt_url
-        
-        print(f"Extracted video URL: {dubbed_video_url}")
-        print(f"Extracted subtitles URL: {subtitles_url}")
-
-        notes = None
-        if subtitles_url:
-            try:
-                srt_bytes = download_url_bytes(subtitles_url)
-                transcript_text = srt_to_plain_text(srt_bytes)
-                notes = generate_notes_from_text(transcript_text)
-            except Exception as e:
-                notes = f"- (Could not generate notes) {e}"
-
-        return {
-            "status": s.lower(),
-            "dubbed_video_url": dubbed_video_url,
-            "subtitles_url": subtitles_url,
-            "notes": notes
-        }
-    except Exception as e:
-        import traceback
-        print(f"Error in dub status: {e}")
-        print(traceback.format_exc())
-        from fastapi import HTTPException
-        raise HTTPException(status_code=500, detail=str(e))
+async def api_dub_status(job_id: str):
+    # Served from the registry; only _poll_loop talks to Murf
+    return dict(await _get_dub_job(job_id))